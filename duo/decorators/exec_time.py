@@ -1,4 +1,5 @@
 # Standard
+import os
 import time
 
 # Pip
@@ -9,10 +10,14 @@ import time
 
 
 def measure_func_exec_time(func):
+    # Timing is only enabled when DUO_PROFILE is set; otherwise the function is left unwrapped.
+    if not os.environ.get("DUO_PROFILE"):
+        return func
+
     def wrapper(*args, **kwargs):
-        start = time.time()
+        start = time.perf_counter_ns()
         result = func(*args, **kwargs)
-        duration = time.time() - start
+        duration = (time.perf_counter_ns() - start) / 1e9
         if duration < 1:
             print(f"{func.__name__} executed in {duration * 1000:.4f} ms")
         else:
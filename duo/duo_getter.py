@@ -1,5 +1,35 @@
 import os
 
+from itertools import islice
+from types import MappingProxyType
+
+# Read buffer for DUO files, reduces the number of read calls on large files
+_READ_BUFFER_SIZE = 1024 * 1024
+
+# Directory walks, cached per path
+_dir_cache = dict()
+
+
+def _walk_duo_dir(path: str, refresh: bool = False) -> MappingProxyType:
+    """
+    Walks a directory once and caches the absolute paths of all files in it.
+
+    Args:
+        path (str): The directory path to search for files.
+        refresh (bool, optional): Whether to walk the directory again instead of using the cache.
+            Defaults to False.
+
+    Returns:
+        MappingProxyType: A read-only mapping of file names to their absolute paths.
+    """
+    if refresh or path not in _dir_cache:
+        dir_files = dict()
+        for root, _, files in os.walk(path):
+            for f in files:
+                dir_files[f] = os.path.join(root, f)
+        _dir_cache[path] = MappingProxyType(dir_files)
+    return _dir_cache[path]
+
 
 class DuoFileGetter:
     """
@@ -8,7 +38,8 @@ class DuoFileGetter:
     Attributes:
         path (str): The directory path to search for files.
         user_file (str): The specific file name to retrieve from the directory.
-        _file_data (dict): A dictionary of files and their absolute paths.
+        _file_data (MappingProxyType): A read-only mapping of files and their absolute paths.
+        _raw_content (list): The lines of the file, cached after the first full read.
         sample_extraction (bool): Flag to determine whether to extract a sample of the file content.
         sample_size (int): The number of lines to extract if sample_extraction is enabled.
     """
@@ -32,6 +63,7 @@ class DuoFileGetter:
         self.path = path
         self.user_file = user_file
         self._file_data = self.get_duo_abs_file_path()
+        self._raw_content = None
         self.sample_extraction = sample_extraction
         self.sample_size = sample_size
 
@@ -51,38 +83,72 @@ class DuoFileGetter:
             f"\nPreview: {preview}..."
         )
 
-    def get_duo_abs_file_path(self) -> dict:
+    def get_duo_abs_file_path(self) -> MappingProxyType:
         """
         Retrieves the absolute paths of all files in the specified directory.
 
+        The directory is only walked once per path; later objects share the cached,
+        read-only result. If the user file is missing from the cache (e.g. it was added
+        after the walk), the directory is walked again.
+
         Returns:
-            dict: A dictionary mapping file names to their absolute paths.
+            MappingProxyType: A read-only mapping of file names to their absolute paths.
+
+        Raises:
+            FileNotFoundError: If the user file is not in the directory.
         """
-        dir_files = dict()
-        for root, _, files in os.walk(self.path):
-            for f in files:
-                dir_files[f] = os.path.join(root, f)
+        dir_files = _walk_duo_dir(self.path)
+        if self.user_file not in dir_files:
+            dir_files = _walk_duo_dir(self.path, refresh=True)
+        if self.user_file not in dir_files:
+            raise FileNotFoundError(
+                f"'{self.user_file}' was not found in '{self.path}'"
+            )
         return dir_files
 
-    def get_raw_duo_file_content(self) -> list:
+    def iter_raw_duo_file_content(self):
         """
-        Retrieves the content of the user-specified file.
+        Lazily yields the lines of the user-specified file without reading the whole file into memory.
 
-        If sample_extraction is enabled, only the first 'sample_size' lines are returned.
+        If sample_extraction is enabled, only the first 'sample_size' lines are yielded.
+        If the content has already been read, the cached lines are used instead.
 
-        Returns:
-            list: A list of strings representing the lines in the file.
+        Yields:
+            str: The lines in the file.
         """
+        if self._raw_content is not None:
+            yield from self._raw_content
+            return
+
         file_data = self._file_data
         user_file = self.user_file
 
         user_choice_file = file_data.get(user_file)
 
-        with open(user_choice_file, mode="r", encoding="utf-8") as incoming_file:
+        with open(
+            user_choice_file,
+            mode="r",
+            encoding="utf-8",
+            buffering=_READ_BUFFER_SIZE,
+        ) as incoming_file:
             if self.sample_extraction:
-                return incoming_file.readlines()[: self.sample_size]
+                yield from islice(incoming_file, self.sample_size)
             else:
-                return incoming_file.readlines()
+                yield from incoming_file
+
+    def get_raw_duo_file_content(self) -> list:
+        """
+        Retrieves the content of the user-specified file.
+
+        If sample_extraction is enabled, only the first 'sample_size' lines are returned.
+        The lines are read once and cached on the object.
+
+        Returns:
+            list: A list of strings representing the lines in the file.
+        """
+        if self._raw_content is None:
+            self._raw_content = list(self.iter_raw_duo_file_content())
+        return self._raw_content
 
 
 if __name__ == "__main__":
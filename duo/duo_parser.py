@@ -1,10 +1,13 @@
+import csv
 import re
-import statistics
 
-from collections import Counter
+from collections import defaultdict
+from operator import itemgetter
+from typing import Optional
 
 # Pip
-import pandas as pd
+import ahocorasick
+import numpy as np
 import spacy
 from spacy_syllables import SpacySyllables
 
@@ -12,10 +15,25 @@ from spacy_syllables import SpacySyllables
 from duo.duo_getter import DuoFileGetter
 from duo.decorators.exec_time import measure_func_exec_time, post_progress
 
-nlp = spacy.load("de_core_news_sm")
+# Only the tagger/morphologizer (POS tags) and the parser (sentences) are needed
+nlp = spacy.load("de_core_news_sm", disable=["ner", "lemmatizer"])
 
 nlp.add_pipe("syllables", after="tagger", config={"lang": "de_DE"})
 
+# Settings for batching documents through nlp.pipe()
+SPACY_BATCH_SIZE = 64
+SPACY_N_PROCESS = 2
+
+# Constant patterns used for sentence cleaning
+_LINE_TAB_BREAK = re.compile(r"^\t\n$|^\s*\n\s*$")
+_TAB_WHITESPACE = re.compile(r"\n|\t")
+
+# Placeholder for tokens without syllables (e.g. punctuation)
+_NO_SYLLABLES = "∅"
+
+# Characters that mark a sentence as invalid (bullets, dashes, etc.)
+_INVALID_CHARS = frozenset("\uf0a7\uf0e0❍●-❏")
+
 
 class DuoParser(DuoFileGetter):
     """
@@ -26,12 +44,20 @@ class DuoParser(DuoFileGetter):
         user_file (str): The name of the file to process.
         sample_extraction (bool): Whether to extract a sample of the file (default is False).
         sample_size (int): The number of lines to extract if sample_extraction is enabled (default is 20).
+        n_process (int): The number of processes spaCy uses to parse the file.
         __spacy_sentences (list): Tokenized sentences using spaCy's tokenizer.
-        __spacy_syllabized (dict): Syllabized sentences using spaCy.
+        __syllable_counts (list): The number of syllables in each syllabized sentence, as (sentence, count) pairs.
         save_file (str): The path where the syllabized results will be saved.
     """
 
-    def __init__(self, path, user_file, sample_extraction=False, sample_size=20):
+    def __init__(
+        self,
+        path,
+        user_file,
+        sample_extraction=False,
+        sample_size=20,
+        n_process=SPACY_N_PROCESS,
+    ):
         """
         Initializes the DuoParser object and sets up the pipeline for sentence tokenization and syllabization.
 
@@ -40,6 +66,8 @@ class DuoParser(DuoFileGetter):
             user_file (str): The file name to process.
             sample_extraction (bool, optional): Whether to extract a sample of the file content. Defaults to False.
             sample_size (int, optional): Number of lines to extract if sample_extraction is enabled. Defaults to 20.
+            n_process (int, optional): Number of processes spaCy uses to parse the file. Use 1 when the
+                parser itself runs in a worker process. Defaults to SPACY_N_PROCESS.
         """
         super().__init__(
             path=path,
@@ -47,149 +75,180 @@ class DuoParser(DuoFileGetter):
             sample_extraction=sample_extraction,
             sample_size=sample_size,
         )
+        self.n_process = n_process
         self.__spacy_sentences = self.spacy_tokenizer()
-        self.__spacy_syllabized = self.spacy_syllabizer()
+        self.__syllable_counts = [
+            (sentence, sum(len(xs) for xs in syllables))
+            for sentence, syllables in self.spacy_syllabizer()
+        ]
         self.save_file = f"results/{user_file}_syllables.csv"
 
     @staticmethod
-    def __pipeline_step(
-        sentences_to_process: list = None,
-        regular_expression: re.compile = None,
-        expression_operation: str = "find_all",
-        replacement_text: str = " ",
-        length: int = None,
-    ) -> list:
+    def __clean_sentence(sen: str, length: int = 2) -> Optional[str]:
         """
-        A helper method for performing various operations on sentences, such as removing or modifying content.
+        Cleans a single sentence: drops empty lines and short sentences and replaces tabs and line breaks.
 
         Args:
-            sentences_to_process (list): List of sentences to process.
-            regular_expression (re.Pattern): The regular expression pattern to use.
-            expression_operation (str): The operation to perform with the regex (`"find_all"` or `"sub"`).
-            replacement_text (str): The text to replace matched expressions with if performing `"sub"`.
+            sen (str): The sentence to clean.
             length (int, optional): The minimum number of words required in a sentence for it to be kept.
 
         Returns:
-            list: A list of processed sentences.
+            str: The cleaned sentence, or None if the sentence should be removed.
         """
-        sentence_results = list()
+        if _LINE_TAB_BREAK.search(sen):
+            return None
+        if len(sen.split()) <= length:
+            return None
+        return _TAB_WHITESPACE.sub(" ", sen).strip()
 
-        if length is None:
-            for sen in sentences_to_process:
+    @staticmethod
+    def __keep_sentence(
+        sen: str, headers: Optional[ahocorasick.Automaton] = None
+    ) -> bool:
+        """
+        Checks whether a cleaned sentence contains headers, invalid characters or numbers.
 
-                if expression_operation == "find_all":
-                    if not regular_expression.findall(sen):
-                        sentence_results.append(sen)
+        Args:
+            sen (str): The cleaned sentence to check.
+            headers (ahocorasick.Automaton, optional): The headers to look for.
 
-                elif expression_operation == "sub":
-                    res = re.sub(regular_expression, replacement_text, sen)
-                    sentence_results.append(res.strip())
-        else:
-            for sen in sentences_to_process:
-                elements = sen.split()
-                if len(elements) > length:
-                    sentence_results.append(sen)
+        Returns:
+            bool: True if the sentence should be kept.
+        """
+        if headers is not None and next(headers.iter(sen), None) is not None:
+            return False
+        if any(c in _INVALID_CHARS for c in sen):
+            return False
+        return not any(c.isdecimal() for c in sen)
 
-        return sentence_results
+    @staticmethod
+    def __trim_span(span):
+        """
+        Strips leading and trailing whitespace tokens (e.g. line breaks) from a spaCy span.
+
+        Args:
+            span (spacy.tokens.Span): The span to trim.
+
+        Returns:
+            spacy.tokens.Span: The span without surrounding whitespace tokens.
+        """
+        start, end = 0, len(span)
+        while start < end and span[start].is_space:
+            start += 1
+        while end > start and span[end - 1].is_space:
+            end -= 1
+        return span[start:end]
 
     @staticmethod
-    def __regex(**kwargs) -> dict:
+    def __match_spans(sentences: list, sentence_spans: dict, n_process: int) -> list:
         """
-        Generates a set of regular expressions to handle specific sentence cleaning operations.
+        Pairs cleaned sentences with the spans they were parsed as, so that no sentence is parsed twice.
+
+        Sentences whose text was altered by cleaning (or that were never parsed) are
+        run through spaCy in a single batch, each distinct text only once. Repeated
+        sentences share a span, so results are kept per position rather than per span.
 
         Args:
-            kwargs: Additional arguments passed to the method, including sentences to strip tab and whitespace.
+            sentences (list): The cleaned sentences.
+            sentence_spans (dict): A mapping of already parsed sentence texts to their spans.
+            n_process (int): The number of processes spaCy uses to parse the sentences.
 
         Returns:
-            dict: A dictionary of compiled regular expressions for sentence cleaning.
+            list: A list of spaCy spans or docs in the same order as the sentences.
         """
-        sentences_strip_tab_whitespace = kwargs.get("sentences_strip_tab_whitespace")
+        unparsed = list(
+            dict.fromkeys(sen for sen in sentences if sen not in sentence_spans)
+        )
 
-        line_tab_break = re.compile("^\t\n$|^\s*\n\s*$")
-        tab_whitespace = re.compile("\n|\t")
-        invalid_char = re.compile("\uf0a7| |❍|●|-|❏")
-        numbers = re.compile("\d")
+        if unparsed:
+            parsed = nlp.pipe(
+                unparsed,
+                batch_size=SPACY_BATCH_SIZE * 2,
+                n_process=n_process,
+            )
+            sentence_spans = {**sentence_spans, **dict(zip(unparsed, parsed))}
 
-        sentence_counter = Counter(sentences_strip_tab_whitespace)
-        d = {k: v for k, v in sentence_counter.items() if v >= 3}
+        return [sentence_spans[sen] for sen in sentences]
 
-        headers = re.compile("|".join(d.keys()))
+    @staticmethod
+    def __find_headers(counts: dict) -> Optional[ahocorasick.Automaton]:
+        """
+        Builds an Aho-Corasick automaton of the headers, i.e. sentences occurring at least three times.
 
-        expressions = {
-            "line_tab_break": line_tab_break,
-            "headers": headers,
-            "invalid_char": invalid_char,
-            "tab_whitespace": tab_whitespace,
-            "numbers": numbers,
-        }
+        Args:
+            counts (dict): The number of occurrences of each cleaned sentence.
+
+        Returns:
+            ahocorasick.Automaton: The headers automaton, or None if there are no headers.
+        """
+        d = {k: v for k, v in counts.items() if v >= 3}
+
+        if not d:
+            return None
 
-        return expressions
+        headers = ahocorasick.Automaton()
+        for header in d:
+            headers.add_word(header, header)
+        headers.make_automaton()
+
+        return headers
 
     @measure_func_exec_time
     def sentences_preprocess(self, spacy_sentence_tokenizer: bool = True) -> dict:
         """
         Preprocesses the sentences by tokenizing, removing unwanted characters, and applying regex operations.
 
+        When spaCy's sentence tokenizer is used, the file is streamed into spaCy and
+        the raw lines are not kept (`"raw"` is None).
+
         Args:
             spacy_sentence_tokenizer (bool, optional): Whether to use spaCy's sentence tokenizer. Defaults to True.
 
         Returns:
             dict: A dictionary with various versions of the sentences (raw, no whitespace, set length, etc.).
         """
-        duo_file_data = self.get_raw_duo_file_content()
+        duo_file_data = None
         tokenized_sentences = list()
+        sentence_spans = dict()
 
         if spacy_sentence_tokenizer:
-            for sen in duo_file_data:
-                doc = nlp(sen)
+            for doc in nlp.pipe(
+                self.iter_raw_duo_file_content(),
+                batch_size=SPACY_BATCH_SIZE,
+                n_process=self.n_process,
+            ):
                 for s in doc.sents:
                     tokenized_sentences.append(str(s))
+                    span = self.__trim_span(s)
+                    sentence_spans.setdefault(span.text, span)
         else:
+            duo_file_data = self.get_raw_duo_file_content()
             tokenized_sentences = duo_file_data
 
-        regex = self.__regex()
-
-        line_tab_break = regex.get("line_tab_break")
-        tab_whitespace = regex.get("tab_whitespace")
-
-        sentences_empty_removed = self.__pipeline_step(
-            sentences_to_process=tokenized_sentences, regular_expression=line_tab_break
-        )
-        sentences_set_length = self.__pipeline_step(sentences_empty_removed, length=2)
-        sentences_strip_tab_whitespace = self.__pipeline_step(
-            sentences_to_process=sentences_set_length,
-            regular_expression=tab_whitespace,
-            expression_operation="sub",
-        )
-
-        regex = self.__regex(
-            sentences_strip_tab_whitespace=sentences_strip_tab_whitespace
-        )
-        headers = regex.get("headers")
-
-        sentence_headers_removed = self.__pipeline_step(
-            sentences_to_process=sentences_strip_tab_whitespace,
-            regular_expression=headers,
-        )
-        invalid_char = regex.get("invalid_char")
-        sentence_invalid_char_removed = self.__pipeline_step(
-            sentences_to_process=sentence_headers_removed,
-            regular_expression=invalid_char,
-        )
-        numbers = regex.get("numbers")
-        sentence_numbers_removed = self.__pipeline_step(
-            sentences_to_process=sentence_invalid_char_removed,
-            regular_expression=numbers,
+        # Headers depend on all cleaned sentences, so cleaning and filtering are two passes
+        sentence_counts = defaultdict(int)
+        sentences_cleaned = list()
+        for sen in tokenized_sentences:
+            res = self.__clean_sentence(sen)
+            if res is not None:
+                sentences_cleaned.append(res)
+                sentence_counts[res] += 1
+
+        headers = self.__find_headers(sentence_counts)
+        processed = [
+            sen for sen in sentences_cleaned if self.__keep_sentence(sen, headers)
+        ]
+        processed_spans = self.__match_spans(
+            processed, sentence_spans, self.n_process
         )
 
-        processed = sentence_numbers_removed
-
         sentence_process_results = {
             "raw": duo_file_data,
             "no_white_space": "",
             "set_length": "",
             "no_headers": "",
             "processed": processed,
+            "processed_spans": processed_spans,
         }
 
         return sentence_process_results
@@ -197,51 +256,47 @@ class DuoParser(DuoFileGetter):
     @measure_func_exec_time
     def spacy_tokenizer(self):
         """
-        Tokenizes the sentences using spaCy's sentence tokenizer and filters based on POS tags.
+        Filters the sentences parsed during preprocessing based on POS tags.
 
         Returns:
             list: A list of tokenized sentences that meet the inclusion/exclusion criteria.
         """
         spacy_sentences = list()
 
-        processed_sentences = self.sentences_preprocess().get("processed")
-        docs = [nlp(sentence) for sentence in processed_sentences]
-
-        excluded_tags = {"NUM"}
-        include_tags = {"VERB"}
+        docs = self.sentences_preprocess().get("processed_spans")
 
+        # Sentences must contain a verb and no numbers; stop scanning at the first number
         for sen in docs:
-            pos = set()
+            has_verb = False
+            has_num = False
             for tok in sen:
-                pos.add(tok.pos_)
+                pos = tok.pos_
+                if pos == "NUM":
+                    has_num = True
+                    break
+                if pos == "VERB":
+                    has_verb = True
 
-            if not excluded_tags.intersection(pos):
-                if include_tags.intersection(pos):
-                    spacy_sentences.append(sen)
+            if has_verb and not has_num:
+                spacy_sentences.append(sen)
 
         return spacy_sentences
 
     def spacy_syllabizer(self):
         """
-        Applies spaCy's syllable parsing to the tokenized sentences and stores syllable information.
+        Applies spaCy's syllable parsing to the tokenized sentences.
 
         Returns:
-            dict: A dictionary mapping sentences to their syllable breakdowns.
+            list: A list of (sentence, syllable breakdown) pairs, one per sentence occurrence.
         """
         spacy_sentences = self.__spacy_sentences
-        results = dict()
+        results = list()
 
         for sentence in spacy_sentences:
-            syllables = list()
-            for word in sentence:
-
-                if word._.syllables is not None:
-                    syllables.append(word._.syllables)
-                else:
-                    syllables.append("∅")
+            # Tokens without syllables are None; syllable lists are never empty
+            syllables = [word._.syllables or _NO_SYLLABLES for word in sentence]
 
-            results[sentence] = syllables
-            syllables = list()
+            results.append((sentence, syllables))
 
         return results
 
@@ -255,27 +310,21 @@ class DuoParser(DuoFileGetter):
             equality (str, optional): Whether to filter for sentences with syllables greater or less than the threshold. Defaults to "greater".
 
         Returns:
-            dict: A dictionary of sentences filtered by syllable length.
+            list: A list of (sentence, syllable count) pairs filtered by syllable length, sorted by count.
         """
-        spacy_syllabized = self.__spacy_syllabized
-
-        syllable_results = dict()
-
-        for sen in spacy_syllabized:
-
-            syllables = spacy_syllabized.get(sen)
-            f = [x for xs in syllables for x in xs]
-            f_len = len(f)
+        syllable_counts = self.__syllable_counts
 
-            if equality == "greater":
-                if f_len >= syllable_amount:
-                    syllable_results[sen] = f_len
-            elif equality == "less":
-                if f_len <= syllable_amount:
-                    syllable_results[sen] = f_len
+        if equality == "greater":
+            keep = lambda n: n >= syllable_amount
+        elif equality == "less":
+            keep = lambda n: n <= syllable_amount
+        else:
+            keep = lambda n: False
 
-        sorted_results = dict(
-            sorted(syllable_results.items(), key=lambda item: item[1], reverse=True)
+        sorted_results = sorted(
+            ((sen, n) for sen, n in syllable_counts if keep(n)),
+            key=itemgetter(1),
+            reverse=True,
         )
 
         return sorted_results
@@ -285,27 +334,50 @@ class DuoParser(DuoFileGetter):
         """
         Saves the syllabized results to a CSV file and prints summary statistics.
 
+        The preview and statistics are printed at once under the file name, so the
+        reports of files processed in parallel do not get mixed up. Without sentences no
+        statistics are printed; with a single sentence the standard deviation is
+        reported as "n/a".
+
         Args:
-            syllables (dict): A dictionary of sentences and their syllable counts.
+            syllables (list): A list of (sentence, syllable count) pairs.
         """
         outgoing_file = self.save_file
 
-        df = pd.DataFrame(list(syllables.items()), columns=["Sentence", "Syllables"])
-        syllable_value = syllables.values()
-        df.index.name = "Num"
-        print(df.head())
-
-        mean = statistics.mean(syllable_value)
-        mode = statistics.mode(syllable_value)
-        stdev = statistics.stdev(syllable_value)
-        sen_amount = len(syllables)
+        report = [f"{self.user_file}:"]
+        for num, (sen, syllable_count) in enumerate(syllables[:5]):
+            report.append(f"{num}\t{sen}\t{syllable_count}")
 
-        print(
-            f"\nSentences: {sen_amount} | Mean: {mean:.2f} | Mode: {mode} | Std Dev:"
-            f" {stdev:.2f}"
+        syllable_values = np.fromiter(
+            (n for _, n in syllables), dtype=int, count=len(syllables)
         )
+        sen_amount = len(syllables)
 
-        df.to_csv(outgoing_file)
+        if sen_amount == 0:
+            report.append("\nSentences: 0")
+        else:
+            mean = syllable_values.mean()
+            # Like statistics.mode, ties go to the value seen first
+            values, counts = np.unique(syllable_values, return_counts=True)
+            tied = values[counts == counts.max()]
+            mode = syllable_values[np.isin(syllable_values, tied)][0]
+            # The sample standard deviation needs at least two sentences
+            stdev = f"{syllable_values.std(ddof=1):.2f}" if sen_amount > 1 else "n/a"
+
+            report.append(
+                f"\nSentences: {sen_amount} | Mean: {mean:.2f} | Mode: {mode}"
+                f" | Std Dev: {stdev}"
+            )
+
+        print("\n".join(report))
+
+        with open(outgoing_file, mode="w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f, lineterminator="\n")
+            writer.writerow(["Num", "Sentence", "Syllables"])
+            writer.writerows(
+                (num, sen, syllable_count)
+                for num, (sen, syllable_count) in enumerate(syllables)
+            )
 
 
 if __name__ == "__main__":
@@ -1,5 +1,7 @@
 # Standard
-# None
+import os
+
+from multiprocessing import Pool
 
 # Pip
 # None
@@ -7,17 +9,22 @@
 # Custom
 from duo.duo_parser import DuoParser
 
+duo_path = "/Users/christopherchandler/code_repos/RUB/duo"
 
-if __name__ == "__main__":
-    duo_path = "/Users/christopherchandler/code_repos/RUB/duo"
-    files = ["DUO-A1_Kapitel1.txt", "DUO-A1.2.txt", "DUO-B1.txt"]
 
-    for f in files:
-        duo_parser = DuoParser(
-            duo_path, f, sample_extraction=False,)
+def process_one(f):
+    # Pool workers are daemonic and cannot start spaCy's own worker processes
+    duo_parser = DuoParser(duo_path, f, sample_extraction=False, n_process=1)
+
+    syllables = duo_parser.sentences_set_syllable_length(
+        syllable_amount=0, equality="greater"
+    )
 
-        syllables = duo_parser.sentences_set_syllable_length(
-            syllable_amount=0, equality="greater"
-        )
+    duo_parser.save_syllabized_results(syllables)
+
+
+if __name__ == "__main__":
+    files = ["DUO-A1_Kapitel1.txt", "DUO-A1.2.txt", "DUO-B1.txt"]
 
-        duo_parser.save_syllabized_results(syllables)
+    with Pool(min(len(files), os.cpu_count() or 1)) as pool:
+        pool.map(process_one, files)